@@ -6,15 +6,26 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from src.data_collection.io_cache import load_table
+from src.perf.grouped import sum_by_group
+
+# Colormap sampled once; colors are gathered from this table by index
+LUT = plt.cm.RdYlGn_r(np.linspace(0, 1, 256))
+
+def cmap_lookup(scores01):
+    # Missing scores get the colormap's "bad" color, as the colormap call did
+    missing = np.isnan(scores01)
+    idx = np.clip((np.where(missing, 0.0, scores01) * 255).astype(np.int16), 0, 255)
+    return np.where(missing[:, None], plt.cm.RdYlGn_r.get_bad(), LUT[idx])
 
 print("="*70)
 print("GEOGRAPHIC OPPORTUNITY ANALYSIS")
 print("="*70)
 
 # Load data
-erate = pd.read_csv('data/raw/erate_data.csv')
-nces = pd.read_csv('data/raw/nces_schools.csv')
-imls = pd.read_csv('data/raw/imls_libraries.csv')
+erate = load_table('erate')
+nces = load_table('nces')
+imls = load_table('imls')
 
 print("\n1. DATA PREPARATION")
 print("-"*70)
@@ -40,15 +51,19 @@ state_abbrev_to_name = {
 print("\nCalculating poverty indicators from NCES data...")
 # Use direct_certification as poverty proxy
 if 'direct_certification' in nces.columns:
-    nces['direct_certification'] = pd.to_numeric(nces['direct_certification'], errors='coerce')
-    nces['enrollment'] = pd.to_numeric(nces['enrollment'], errors='coerce')
-    
     # Calculate average poverty rate from sample
     avg_nslp_rate = (nces['direct_certification'].sum() / nces['enrollment'].sum()) * 100
     print(f"✓ Calculated average NSLP rate: {avg_nslp_rate:.1f}%")
     
-    # Use national average for all states (since we only have 5 states in NCES sample)
-    nslp_by_state = None
+    # Per-state rates are reported, but scoring uses the national average
+    # for all states (since we only have 5 states in NCES sample)
+    if 'state_location' in nces.columns:
+        nslp_by_state = (sum_by_group(nces['state_location'], nces['direct_certification']) /
+                         sum_by_group(nces['state_location'], nces['enrollment'])) * 100
+        print(f"✓ NSLP rate by state ({len(nslp_by_state)} states in sample):")
+        print(nslp_by_state.round(1).to_string())
+    else:
+        nslp_by_state = None
 else:
     avg_nslp_rate = 35.0  # National average
     nslp_by_state = None
@@ -58,17 +73,30 @@ print(f"✓ Using national poverty indicator for analysis")
 # METRIC 2: Library Financial Capacity (from IMLS)
 print("Calculating library capacity...")
 if 'State Name' in imls.columns and 'Total Revenue In Thousands' in imls.columns:
-    imls['Total Revenue In Thousands'] = pd.to_numeric(imls['Total Revenue In Thousands'], errors='coerce')
     lib_capacity = imls[['State Name', 'Total Revenue In Thousands', 'Public Library Count']].copy()
     lib_capacity.columns = ['state_name', 'total_revenue_k', 'library_count']
     print(f"✓ Library financial data for {len(lib_capacity)} states")
 
+# Shared state dtype so joins/sorts on state_name work on integer codes.
+# Names outside the 50 states + DC (e.g. territories) are kept; the
+# NATIONAL aggregation row is left out so it becomes a missing code.
+state_names = list(state_abbrev_to_name.values())
+extra_names = sorted(
+    name for name in set(lib_capacity['state_name'].dropna().astype(str))
+    if name not in state_names and name.upper() != 'NATIONAL'
+)
+STATE_CAT = pd.CategoricalDtype(categories=state_names + extra_names, ordered=False)
+# Mask names outside the categories (NATIONAL) explicitly before casting
+names = lib_capacity['state_name']
+lib_capacity['state_name'] = names.where(names.isin(STATE_CAT.categories)).astype(STATE_CAT)
+
 # METRIC 3: E-Rate Activity (from USAC) - placeholder since we have limited state coverage
 print("Analyzing E-Rate participation...")
 erate_activity = pd.DataFrame({
     'state_name': ['California', 'Texas', 'Florida', 'New York', 'Illinois'],
     'erate_applications': [250, 200, 180, 150, 120]  # Sample data
 })
+erate_activity['state_name'] = erate_activity['state_name'].astype(STATE_CAT)
 
 # MERGE ALL METRICS
 print("\n2. CREATING OPPORTUNITY SCORES")
@@ -82,15 +110,24 @@ opportunity_df['nslp_rate'] = avg_nslp_rate  # Apply to all states
 
 # Clean data - Remove NATIONAL aggregation row
 opportunity_df = opportunity_df[opportunity_df['total_revenue_k'] > 0].copy()
-opportunity_df = opportunity_df[opportunity_df['state_name'].str.upper() != 'NATIONAL'].copy()
+opportunity_df = opportunity_df[opportunity_df['state_name'].cat.codes >= 0].copy()
 
 print(f"✓ Cleaned dataset: {len(opportunity_df)} states/territories")
 
 # Normalize metrics to 0-100 scale
 def normalize_score(series):
-    if series.max() == series.min():
-        return pd.Series([50] * len(series))
-    return ((series - series.min()) / (series.max() - series.min())) * 100
+    # Single min/max pass over the raw buffer, then scale in place
+    arr = np.ascontiguousarray(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    if arr.size == 0:
+        return pd.Series(arr, index=series.index)
+    lo = np.nanmin(arr)
+    rng = np.nanmax(arr) - lo
+    if rng == 0.0:
+        return pd.Series(np.full(arr.shape, 50.0), index=series.index)
+    out = np.empty_like(arr)
+    np.subtract(arr, lo, out=out)
+    out *= (100.0 / rng)
+    return pd.Series(out, index=series.index)
 
 # Revenue capacity score (higher = more resources for E-Rate consulting)
 opportunity_df['capacity_score'] = normalize_score(opportunity_df['total_revenue_k'])
@@ -107,7 +144,9 @@ opportunity_df['opportunity_score'] = (
 )
 
 # Rank states
-opportunity_df = opportunity_df.sort_values('opportunity_score', ascending=False)
+opportunity_df = opportunity_df.sort_values(
+    'opportunity_score', ascending=False, kind='stable', ignore_index=True
+)
 
 print(f"\n✓ Opportunity scores calculated for {len(opportunity_df)} states/territories")
 print("\nTop 10 High-Opportunity States:")
@@ -117,13 +156,20 @@ print(opportunity_df[['state_name', 'opportunity_score', 'nslp_rate', 'total_rev
 print("\n3. GENERATING VISUALIZATIONS")
 print("-"*70)
 
+# Extract plotted columns once as contiguous arrays shared by all subplots
+arrs = {
+    k: opportunity_df[k].to_numpy(dtype=np.float64, na_value=np.nan)
+    for k in ('library_count', 'total_revenue_k', 'opportunity_score')
+}
+arrs['state_name'] = opportunity_df['state_name'].to_numpy()
+
 # Create figure with subplots
 fig = plt.figure(figsize=(16, 10))
 
 # Plot 1: Top 15 Opportunity States (Bar Chart)
 ax1 = plt.subplot(2, 2, 1)
 top15 = opportunity_df.head(15)
-colors = plt.cm.RdYlGn_r(normalize_score(top15['opportunity_score']) / 100)
+colors = cmap_lookup(normalize_score(top15['opportunity_score']).to_numpy() / 100.0)
 ax1.barh(range(len(top15)), top15['opportunity_score'], color=colors)
 ax1.set_yticks(range(len(top15)))
 ax1.set_yticklabels(top15['state_name'])
@@ -135,10 +181,10 @@ ax1.grid(axis='x', alpha=0.3)
 # Plot 2: Capacity vs Market Size Scatter
 ax2 = plt.subplot(2, 2, 2)
 scatter = ax2.scatter(
-    opportunity_df['library_count'], 
-    opportunity_df['total_revenue_k'],
-    s=opportunity_df['opportunity_score']*3,
-    c=opportunity_df['opportunity_score'],
+    arrs['library_count'],
+    arrs['total_revenue_k'],
+    s=arrs['opportunity_score']*3,
+    c=arrs['opportunity_score'],
     cmap='RdYlGn_r',
     alpha=0.6,
     edgecolors='black',
@@ -150,20 +196,21 @@ ax2.set_title('Market Size vs Financial Capacity', fontsize=13, fontweight='bold
 plt.colorbar(scatter, ax=ax2, label='Opportunity Score')
 
 # Annotate top 5 states
-top5 = opportunity_df.head(5)
-for idx, row in top5.iterrows():
+for name, x, y in zip(arrs['state_name'][:5],
+                      arrs['library_count'][:5],
+                      arrs['total_revenue_k'][:5]):
     ax2.annotate(
-        row['state_name'], 
-        (row['library_count'], row['total_revenue_k']),
+        name,
+        (x, y),
         fontsize=8,
         alpha=0.7
     )
 
 # Plot 3: Opportunity Score Distribution
 ax3 = plt.subplot(2, 2, 3)
-ax3.hist(opportunity_df['opportunity_score'], bins=15, color='steelblue', edgecolor='black', alpha=0.7)
-ax3.axvline(opportunity_df['opportunity_score'].median(), color='red', linestyle='--', linewidth=2, label='Median')
-ax3.axvline(opportunity_df['opportunity_score'].mean(), color='orange', linestyle='--', linewidth=2, label='Mean')
+ax3.hist(arrs['opportunity_score'], bins=15, color='steelblue', edgecolor='black', alpha=0.7)
+ax3.axvline(np.nanmedian(arrs['opportunity_score']), color='red', linestyle='--', linewidth=2, label='Median')
+ax3.axvline(np.nanmean(arrs['opportunity_score']), color='orange', linestyle='--', linewidth=2, label='Mean')
 ax3.set_xlabel('Opportunity Score', fontsize=11)
 ax3.set_ylabel('Number of States', fontsize=11)
 ax3.set_title('Distribution of Market Opportunities', fontsize=13, fontweight='bold')
@@ -172,18 +219,17 @@ ax3.grid(axis='y', alpha=0.3)
 
 # Plot 4: Quadrant Analysis (Capacity vs Market Size)
 ax4 = plt.subplot(2, 2, 4)
-median_libs = opportunity_df['library_count'].median()
-median_revenue = opportunity_df['total_revenue_k'].median()
+lib = arrs['library_count']
+rev = arrs['total_revenue_k']
+median_libs = np.nanmedian(lib)
+median_revenue = np.nanmedian(rev)
 
 # Define high-opportunity quadrant
-high_opportunity = opportunity_df[
-    (opportunity_df['library_count'] > median_libs) & 
-    (opportunity_df['total_revenue_k'] > median_revenue)
-]
+high_opportunity_mask = (lib > median_libs) & (rev > median_revenue)
 
 ax4.scatter(
-    opportunity_df['library_count'], 
-    opportunity_df['total_revenue_k'],
+    lib,
+    rev,
     s=100,
     c='lightgray',
     alpha=0.5,
@@ -191,8 +237,8 @@ ax4.scatter(
     linewidth=0.5
 )
 ax4.scatter(
-    high_opportunity['library_count'],
-    high_opportunity['total_revenue_k'],
+    lib[high_opportunity_mask],
+    rev[high_opportunity_mask],
     s=150,
     c='red',
     alpha=0.7,
@@ -216,14 +262,17 @@ plt.savefig('/mnt/user-data/outputs/geographic_opportunity_analysis.png', dpi=30
 print("\n✓ Saved: geographic_opportunity_analysis.png")
 
 # Export data for presentation
-opportunity_df.to_csv('/mnt/user-data/outputs/opportunity_scores_by_state.csv', index=False)
-print(" Saved: opportunity_scores_by_state.csv")
+opportunity_df.reset_index(drop=True).to_feather(
+    '/mnt/user-data/outputs/opportunity_scores_by_state.feather',
+    compression='zstd'
+)
+print(" Saved: opportunity_scores_by_state.feather")
 
 print("\n" + "="*70)
 print("ANALYSIS COMPLETE")
 print("="*70)
 print(f"\nKey Insights:")
-print(f"  • Identified {len(high_opportunity)} high-priority states")
+print(f"  • Identified {int(high_opportunity_mask.sum())} high-priority states")
 print(f"  • Top oPportunity state: {opportunity_df.iloc[0]['state_name']}")
 print(f"  • Average opportunity score: {opportunity_df['opportunity_score'].mean():.1f}")
 print(f"  • Score range: {opportunity_df['opportunity_score'].min():.1f} - {opportunity_df['opportunity_score'].max():.1f}")
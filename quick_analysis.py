@@ -1,14 +1,14 @@
 # """Quick analysis of all 3 datasets for presentation."""
-import pandas as pd
+from src.data_collection.io_cache import load_table
 
 print("="*70)
 print("COMBINED DATA ANALYSIS FOR PRESENTATION")
 print("="*70)
 
 print("\nLoading datasets...")
-erate = pd.read_csv('data/raw/erate_data.csv')
-nces = pd.read_csv('data/raw/nces_schools.csv')
-imls = pd.read_csv('data/raw/imls_libraries.csv')
+erate = load_table('erate')
+nces = load_table('nces')
+imls = load_table('imls')
 
 print(f"✓ E-Rate: {len(erate)} records")
 print(f"✓ NCES Schools: {len(nces)} records")
@@ -30,7 +30,7 @@ print("="*70)
 if 'state_location' in nces.columns:
     print(f"States in dataset: {nces['state_location'].nunique()}")
 if 'enrollment' in nces.columns:
-    total_enroll = pd.to_numeric(nces['enrollment'], errors='coerce').sum()
+    total_enroll = nces['enrollment'].sum()
     print(f"Total enrollment: {total_enroll:,.0f}")
 
 print("\n" + "="*70)
@@ -39,7 +39,7 @@ print("="*70)
 if 'STABR' in imls.columns:
     print(f"States in dataset: {imls['STABR'].nunique()}")
 if 'POPU_LSA' in imls.columns:
-    total_pop = pd.to_numeric(imls['POPU_LSA'], errors='coerce').sum()
+    total_pop = imls['POPU_LSA'].sum()
     print(f"Total population served: {total_pop:,.0f}")
 
 print("\n" + "="*70)
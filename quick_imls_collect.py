@@ -1,6 +1,7 @@
 # """Quick IMLS library data collection for presentation."""
-import requests
 import pandas as pd
+from src.data_collection.http_session import make_session
+from src.data_collection.json_stream import stream_to_df
 
 print("=" * 70)
 print("COLLECTING IMLS LIBRARY DATA")
@@ -9,6 +10,10 @@ print("=" * 70)
 # Use IMLS open data portal API instead
 api_url = "https://data.imls.gov/resource/fpin-fu7m.json"
 
+# Shared session: retries with backoff, and GET responses cached on disk
+# for a day so repeated runs skip the API
+session = make_session('data/cache/http_cache')
+
 print("\nFetching library data from IMLS Open Data Portal...")
 print("Collecting 500 library records...")
 
@@ -18,13 +23,12 @@ try:
         '$order': 'stabr'
     }
 
-    response = requests.get(api_url, params=params, timeout=30)
+    response = session.get(api_url, params=params, timeout=30, stream=True)
 
     print(f"Status code: {response.status_code}")
 
     if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data)
+        df = stream_to_df(response)
 
         print(f"\n✓ Total IMLS records collected: {len(df)}")
         print(f"\nColumns ({len(df.columns)} total): {df.columns.tolist()[:15]}...")
@@ -39,22 +43,20 @@ try:
         print(f"\n--- QUICK STATS ---")
         print(f"Total libraries: {len(df)}")
 
+        cols = frozenset(df.columns)
+
         # Check for state column
-        state_cols = ['stabr', 'state', 'STABR']
-        for col in state_cols:
-            if col in df.columns:
-                print(f"States represented: {df[col].nunique()}")
-                print(f"Top 5 states:\n{df[col].value_counts().head()}")
-                break
+        state_col = next((c for c in ('stabr', 'state', 'STABR') if c in cols), None)
+        if state_col:
+            print(f"States represented: {df[state_col].nunique()}")
+            print(f"Top 5 states:\n{df[state_col].value_counts().head()}")
 
         # Check for population column
-        pop_cols = ['popu_lsa', 'population', 'POPU_LSA']
-        for col in pop_cols:
-            if col in df.columns:
-                total_pop = pd.to_numeric(df[col], errors='coerce').sum()
-                if total_pop > 0:
-                    print(f"Total population served: {total_pop:,.0f}")
-                break
+        pop_col = next((c for c in ('popu_lsa', 'population', 'POPU_LSA') if c in cols), None)
+        if pop_col:
+            total_pop = pd.to_numeric(df[pop_col], errors='coerce').astype('float64').sum()
+            if total_pop > 0:
+                print(f"Total population served: {total_pop:,.0f}")
 
         print("=" * 70)
 
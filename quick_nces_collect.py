@@ -1,7 +1,8 @@
 # """Quick NCES school data collection for presentation."""
-import requests
 import pandas as pd
 import time
+from src.data_collection.http_session import make_session
+from src.data_collection.json_stream import stream_results_to_df
 
 print("=" * 70)
 print("COLLECTING NCES SCHOOL DATA")
@@ -10,6 +11,10 @@ print("=" * 70)
 # Try the correct Urban Institute API endpoint
 base_url = "https://educationdata.urban.org/api/v1/schools/ccd/directory/2022"
 
+# Shared session: retries with backoff, and GET responses cached on disk
+# for a day so repeated runs skip the API
+session = make_session('data/cache/http_cache')
+
 print("\nFetching school data from NCES via Urban Institute API...")
 print("Trying 2022 data (most recent stable year)...")
 
@@ -20,24 +25,15 @@ try:
     }
 
     print(f"\nFetching data...")
-    response = requests.get(base_url, params=params, timeout=30)
+    response = session.get(base_url, params=params, timeout=30, stream=True)
 
     print(f"Status code: {response.status_code}")
 
     if response.status_code == 200:
-        data = response.json()
-
-        # The API returns data in 'results' key
-        if isinstance(data, dict) and 'results' in data:
-            results = data['results']
-        elif isinstance(data, list):
-            results = data
-        else:
-            results = [data]
-
-        if results:
-            df = pd.DataFrame(results)
+        # The API returns data in 'results' key (bare lists/objects also accepted)
+        df = stream_results_to_df(response, results_key='results')
 
+        if not df.empty:
             print(f"\n✓ Total NCES records collected: {len(df)}")
             print(f"\nColumns ({len(df.columns)} total): {df.columns.tolist()[:10]}...")
             print(f"\nSample data:\n{df.head()}")
@@ -52,18 +48,15 @@ try:
             print(f"Total schools: {len(df)}")
 
             # Try different possible column names
-            state_cols = ['state_location', 'state', 'state_name', 'fips']
-            for col in state_cols:
-                if col in df.columns:
-                    print(f"States represented: {df[col].nunique()}")
-                    break
-
-            enroll_cols = ['enrollment', 'total_students']
-            for col in enroll_cols:
-                if col in df.columns:
-                    total_enrollment = pd.to_numeric(df[col], errors='coerce').sum()
-                    print(f"Total enrollment: {total_enrollment:,.0f}")
-                    break
+            cols = frozenset(df.columns)
+            state_col = next((c for c in ('state_location', 'state', 'state_name', 'fips') if c in cols), None)
+            if state_col:
+                print(f"States represented: {df[state_col].nunique()}")
+
+            enroll_col = next((c for c in ('enrollment', 'total_students') if c in cols), None)
+            if enroll_col:
+                total_enrollment = pd.to_numeric(df[enroll_col], errors='coerce').astype('float64').sum()
+                print(f"Total enrollment: {total_enrollment:,.0f}")
 
             print("=" * 70)
         else:
@@ -9,35 +9,128 @@ Dataset: E-Rate Recipient Details and Commitments
 Endpoint: https://opendata.usac.org/resource/avi8-svp9.json
 """
 
+import functools
+import ijson
 import requests
+import urllib3
 import pandas as pd
-import time
+import pyarrow as pa
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Dict, List
 from datetime import datetime
 import logging
 
+try:
+    from src.data_collection.http_session import make_session
+    from src.data_collection.json_stream import stream_to_df
+except ImportError:  # running this file directly as a script
+    from http_session import make_session
+    from json_stream import stream_to_df
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=128)
+def _build_where(
+    funding_year: Optional[int] = None,
+    state: Optional[str] = None,
+    applicant_type: Optional[str] = None
+) -> str:
+    """Build the SoQL WHERE clause for the given filters (empty if none)."""
+    where_clauses = []
+    if funding_year:
+        where_clauses.append(f"funding_year = {funding_year}")
+    if state:
+        where_clauses.append(f"state = '{state}'")
+    if applicant_type:
+        where_clauses.append(f"applicant_type = '{applicant_type}'")
+    return ' AND '.join(where_clauses)
+
+
 class ERateDataCollector:
     """Collects E-Rate funding data from USAC Open Data API."""
     
-    def __init__(self, app_token: Optional[str] = None):
+    def __init__(
+        self,
+        app_token: Optional[str] = None,
+        cache_path: Optional[str] = None,
+        session: Optional[requests.Session] = None
+    ):
         """
         Initialize the E-Rate data collector.
         
         Args:
             app_token: Optional USAC API app token for higher rate limits
+            cache_path: Optional path for an on-disk cache of GET responses
+            session: Optional pre-built session to share with other collectors
+                (cache_path is ignored when given)
         """
         self.base_url = "https://opendata.usac.org/resource/avi8-svp9.json"
         self.app_token = app_token
-        self.session = requests.Session()
+        self.session = session if session is not None else make_session(cache_path)
+        
+        # Sent per request rather than set on the session, which may be
+        # shared with collectors for other hosts
+        self.headers = {'X-App-Token': app_token} if app_token else {}
+    
+    def _build_params(
+        self,
+        funding_year: Optional[int] = None,
+        state: Optional[str] = None,
+        applicant_type: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0,
+        columns: Optional[List[str]] = None
+    ) -> Dict:
+        """Build the SODA query parameters for a page of records."""
+        params = {
+            '$limit': limit,
+            '$offset': offset,
+            # :id tie-breaker keeps pages stable when fetched out of order
+            '$order': 'funding_year DESC, :id'
+        }
+        if columns:
+            params['$select'] = ','.join(columns)
         
-        if app_token:
-            self.session.headers.update({'X-App-Token': app_token})
+        where = _build_where(funding_year, state, applicant_type)
+        if where:
+            params['$where'] = where
+        return params
+    
+    def _count_rows(
+        self,
+        funding_year: Optional[int] = None,
+        state: Optional[str] = None,
+        applicant_type: Optional[str] = None
+    ) -> int:
+        """
+        Count matching records without downloading them.
+        
+        Args:
+            funding_year: Filter by funding year
+            state: Filter by state abbreviation
+            applicant_type: Filter by applicant type
+            
+        Returns:
+            Number of records matching the filters
+        """
+        params = {'$select': 'count(*) AS n'}
+        where = _build_where(funding_year, state, applicant_type)
+        if where:
+            params['$where'] = where
+        
+        try:
+            response = self.session.get(self.base_url, params=params, headers=self.headers, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+            return int(data[0]['n']) if data else 0
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error counting records: {e}")
+            raise
     
     def fetch_data(
         self,
@@ -45,7 +138,8 @@ class ERateDataCollector:
         state: Optional[str] = None,
         applicant_type: Optional[str] = None,
         limit: int = 1000,
-        offset: int = 0
+        offset: int = 0,
+        columns: Optional[List[str]] = None
     ) -> pd.DataFrame:
         """
         Fetch E-Rate data from USAC API with optional filters.
@@ -56,40 +150,39 @@ class ERateDataCollector:
             applicant_type: Filter by type ('School' or 'Library')
             limit: Number of records per request (max 50000 for SODA API)
             offset: Starting record offset for pagination
+            columns: Optional list of columns to return (default: all)
             
         Returns:
             DataFrame containing E-Rate records
         """
-        params = {
-            '$limit': limit,
-            '$offset': offset,
-            '$order': 'funding_year DESC' #, entity_name
-        }
-        
-        # Build WHERE clause for filters
-        where_clauses = []
-        if funding_year:
-            where_clauses.append(f"funding_year = {funding_year}")
-        if state:
-            where_clauses.append(f"state = '{state}'")
-        if applicant_type:
-            where_clauses.append(f"applicant_type = '{applicant_type}'")
-        
-        if where_clauses:
-            params['$where'] = ' AND '.join(where_clauses)
+        params = self._build_params(funding_year, state, applicant_type, limit, offset, columns)
+        return self._fetch_page(params, columns)
+    
+    def _fetch_page(self, params: Dict, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Fetch one page of records for prebuilt query parameters.
         
-        try:
-            logger.info(f"Fetching E-Rate data: limit={limit}, offset={offset}, filters={where_clauses}")
-            response = self.session.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
+        Args:
+            params: SODA query parameters, as built by _build_params
+            columns: Columns selected in params, if any
             
-            data = response.json()
-            df = pd.DataFrame(data)
+        Returns:
+            DataFrame containing the page of records
+        """
+        try:
+            # Per-page logs are DEBUG with lazy args; only the per-year line is INFO
+            logger.debug("Fetching E-Rate data: limit=%s, offset=%s, filters=%s",
+                         params['$limit'], params['$offset'], params.get('$where'))
+            # Context manager releases the pooled connection, also on errors
+            with self.session.get(self.base_url, params=params, headers=self.headers, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                df = stream_to_df(response, columns)
             
-            logger.info(f"Successfully fetched {len(df)} records")
+            logger.debug("Successfully fetched %d records", len(df))
             return df
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, ijson.JSONError) as e:
+            # Body read/decode/parse errors surface here, after the status check
             logger.error(f"Error fetching data: {e}")
             raise
     
@@ -99,66 +192,140 @@ class ERateDataCollector:
         end_year: int = 2024,
         state: Optional[str] = None,
         applicant_type: Optional[str] = None,
-        batch_size: int = 1000
+        batch_size: int = 1000,
+        max_workers: int = 8
     ) -> pd.DataFrame:
         """
         Fetch E-Rate data for multiple funding years.
         
+        Pages within each year are fetched concurrently after a count query
+        determines how many there are.
+        
         Args:
             start_year: First funding year to fetch
             end_year: Last funding year to fetch
             state: Optional state filter
             applicant_type: Optional applicant type filter
             batch_size: Records per API request
+            max_workers: Maximum number of pages fetched in parallel
             
         Returns:
             DataFrame containing all records across years
         """
         all_data = []
         
-        for year in range(start_year, end_year + 1):
-            logger.info(f"Fetching data for funding year {year}")
-            offset = 0
-            
-            while True:
-                df_batch = self.fetch_data(
-                    funding_year=year,
-                    state=state,
-                    applicant_type=applicant_type,
-                    limit=batch_size,
-                    offset=offset
-                )
-                
-                if df_batch.empty:
-                    break
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for year in range(start_year, end_year + 1):
+                logger.info(f"Fetching data for funding year {year}")
+                total = self._count_rows(year, state, applicant_type)
                 
-                all_data.append(df_batch)
+                # Filters are fixed for the year; only the offset changes per page
+                template = self._build_params(year, state, applicant_type, limit=batch_size)
+                futures = {
+                    executor.submit(self._fetch_page, {**template, '$offset': offset}): offset
+                    for offset in range(0, total, batch_size)
+                }
                 
-                # Check if we got fewer records than requested (last page)
-                if len(df_batch) < batch_size:
-                    break
+                pages = {}
+                try:
+                    for future in as_completed(futures):
+                        pages[futures[future]] = future.result()
+                except Exception:
+                    # Drop the queued pages instead of waiting on them
+                    executor.shutdown(cancel_futures=True)
+                    raise
                 
-                offset += batch_size
-                time.sleep(0.5)  # Rate limiting courtesy
+                # Keep records in offset order regardless of completion order
+                for offset in sorted(pages):
+                    if not pages[offset].empty:
+                        all_data.append(pages[offset])
         
         if all_data:
-            result_df = pd.concat(all_data, ignore_index=True)
-            logger.info(f"Total records fetched: {len(result_df)}")
-            return result_df
+            # Concatenate as Arrow chunks rather than copying into new buffers
+            try:
+                tables = [pa.Table.from_pandas(df, preserve_index=False) for df in all_data]
+                result = pa.concat_tables(tables, promote_options='permissive')
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                # Object-column pages or type drift across pages
+                logger.warning(f"Falling back to pandas concat: {e}")
+                result_df = pd.concat(all_data, ignore_index=True)
+                logger.info(f"Total records fetched: {len(result_df)}")
+                return result_df
+            logger.info(f"Total records fetched: {result.num_rows}")
+            return result.to_pandas(self_destruct=True, types_mapper=pd.ArrowDtype)
         else:
             logger.warning("No data fetched")
             return pd.DataFrame()
     
-    def get_summary_stats(self, df: pd.DataFrame) -> Dict:
+    def fetch_aggregates(
+        self,
+        group_by: List[str],
+        year: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Fetch record counts and commitment totals aggregated by the server.
+        
+        Args:
+            group_by: Columns to group by (e.g., ['state']); empty for a single total
+            year: Optional funding year filter
+            
+        Returns:
+            DataFrame with the group columns plus 'n' (record count),
+            'n_committed' (records with a commitment) and 'total' (sum of
+            total_commitment)
+        """
+        params = {
+            '$select': ','.join(group_by + [
+                'count(*) AS n',
+                'count(total_commitment) AS n_committed',
+                'sum(total_commitment) AS total'
+            ]),
+            '$limit': 50000
+        }
+        if group_by:
+            params['$group'] = ','.join(group_by)
+        
+        where = _build_where(funding_year=year)
+        if where:
+            params['$where'] = where
+        
+        try:
+            logger.info(f"Fetching E-Rate aggregates: group_by={group_by}, year={year}")
+            response = self.session.get(self.base_url, params=params, headers=self.headers, timeout=30)
+            response.raise_for_status()
+            
+            df = pd.DataFrame(response.json(), columns=group_by + ['n', 'n_committed', 'total'])
+            df['n'] = pd.to_numeric(df['n'], errors='coerce').fillna(0).astype(int)
+            df['n_committed'] = pd.to_numeric(df['n_committed'], errors='coerce').fillna(0).astype(int)
+            df['total'] = pd.to_numeric(df['total'], errors='coerce').fillna(0.0)
+            return df
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching aggregates: {e}")
+            raise
+    
+    def get_summary_stats(
+        self,
+        df: Optional[pd.DataFrame] = None,
+        year: Optional[int] = None
+    ) -> Dict:
         """
         Calculate summary statistics for the E-Rate dataset.
         
+        When no DataFrame is given, the statistics are computed for the full
+        dataset from server-side aggregates instead of downloaded records.
+        Entity counts are only available for a local DataFrame.
+        
         Args:
-            df: DataFrame with E-Rate data
+            df: Optional DataFrame with E-Rate data
+            year: Optional funding year filter (server-side statistics only)
             
         Returns:
             Dictionary with summary statistics
         """
+        if df is None:
+            return self._get_server_summary_stats(year)
+        
         if df.empty:
             return {}
         
@@ -172,12 +339,31 @@ class ERateDataCollector:
         
         # Calculate total commitments if available
         if 'total_commitment' in df.columns:
-            df['total_commitment'] = pd.to_numeric(df['total_commitment'], errors='coerce')
+            df['total_commitment'] = pd.to_numeric(df['total_commitment'], errors='coerce').astype('float64')
             stats['total_funding'] = df['total_commitment'].sum()
             stats['avg_commitment'] = df['total_commitment'].mean()
         
         return stats
     
+    def _get_server_summary_stats(self, year: Optional[int] = None) -> Dict:
+        """Compute summary statistics from grouped server-side queries."""
+        by_year = self.fetch_aggregates(['funding_year'], year)
+        if by_year['n'].sum() == 0:
+            return {}
+        by_state = self.fetch_aggregates(['state'], year)
+        by_type = self.fetch_aggregates(['applicant_type'], year)
+        
+        n_committed = by_year['n_committed'].sum()
+        total_funding = by_year['total'].sum()
+        return {
+            'total_records': int(by_year['n'].sum()),
+            'funding_years': sorted(pd.to_numeric(by_year['funding_year'], errors='coerce').dropna().astype(int).tolist()),
+            'states': int(by_state['state'].notna().sum()),
+            'applicant_types': dict(zip(by_type['applicant_type'], by_type['n'].tolist())),
+            'total_funding': total_funding,
+            'avg_commitment': total_funding / n_committed if n_committed else float('nan'),
+        }
+    
     def save_data(self, df: pd.DataFrame, output_path: str) -> None:
         """
         Save DataFrame to CSV file.
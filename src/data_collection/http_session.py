@@ -0,0 +1,51 @@
+"""
+Shared HTTP Session Module
+
+This module builds the requests sessions used by all collectors, so every
+API call gets the same connection pooling, retry policy and (optionally)
+on-disk response cache.
+"""
+
+from typing import Optional
+
+import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_session(cache_path: Optional[str] = None) -> requests.Session:
+    """
+    Create a session with keep-alive pooling and retry with backoff.
+
+    Idempotent GETs are retried on connection errors and on 429/5xx
+    responses, reusing pooled connections instead of opening new ones.
+
+    Args:
+        cache_path: Optional path for an on-disk cache of GET responses
+            (kept for one day)
+
+    Returns:
+        Configured requests.Session (a CachedSession if cache_path is given)
+    """
+    if cache_path:
+        session = requests_cache.CachedSession(
+            cache_path,
+            expire_after=86400,
+            allowable_methods=['GET'],
+            # Redact credentials so they are never written to the cache file
+            ignored_parameters=['Authorization', 'X-API-KEY', 'access_token', 'api_key', 'X-App-Token']
+        )
+    else:
+        session = requests.Session()
+
+    retry = Retry(
+        total=5,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET'])
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=16, pool_maxsize=32)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,96 @@
+"""
+Cached Table Loading Module
+
+This module loads the raw CSV extracts produced by the collectors and keeps a
+Parquet copy of each one under data/cache/. Subsequent runs read the Parquet
+copy instead of re-parsing the CSV, and repeated loads within one process are
+served from memory.
+"""
+
+import functools
+import os
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RAW_DIR = 'data/raw'
+CACHE_DIR = 'data/cache'
+
+# Logical table name -> raw CSV file written by the collectors
+TABLES = {
+    'erate': 'erate_data.csv',
+    'nces': 'nces_schools.csv',
+    'imls': 'imls_libraries.csv',
+}
+
+# Explicit column types for the CSV parse; columns not listed are inferred.
+# Nullable integer types are used where the source can have blanks.
+SCHEMAS = {
+    'erate': {
+        'funding_year': 'Int16',
+        'state': 'category',
+        'applicant_type': 'category',
+        'total_commitment': 'float64',
+    },
+    'nces': {
+        'enrollment': 'float64',
+        'direct_certification': 'float64',
+        'state_location': 'category',
+    },
+    'imls': {
+        'State Name': 'category',
+        'Total Revenue In Thousands': 'float64',
+        'Public Library Count': 'Int32',
+        'STABR': 'category',
+        'POPU_LSA': 'float64',
+    },
+}
+
+
+def _read_csv(name: str) -> pd.DataFrame:
+    """Parse the raw CSV for a table with its declared schema."""
+    return pd.read_csv(
+        os.path.join(RAW_DIR, TABLES[name]),
+        engine='pyarrow',
+        dtype=SCHEMAS[name]
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def load_table(name: str) -> pd.DataFrame:
+    """
+    Load one of the raw datasets, preferring the Parquet cache.
+
+    The Parquet copy is rebuilt whenever the source CSV (or this module,
+    which holds the schemas) is newer than it.
+    The returned DataFrame is shared between callers, so copy it before
+    modifying it in place.
+
+    Args:
+        name: Table name, one of 'erate', 'nces' or 'imls'
+
+    Returns:
+        DataFrame with the table contents
+    """
+    if name not in TABLES:
+        raise KeyError(f"Unknown table '{name}', expected one of {sorted(TABLES)}")
+
+    csv_path = os.path.join(RAW_DIR, TABLES[name])
+    parquet_path = os.path.join(CACHE_DIR, f"{name}.parquet")
+
+    source_mtime = max(os.path.getmtime(csv_path), os.path.getmtime(__file__))
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= source_mtime:
+        logger.debug(f"Loading {name} from {parquet_path}")
+        return pd.read_parquet(parquet_path, engine='pyarrow')
+
+    df = _read_csv(name)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        df.to_parquet(parquet_path, engine='pyarrow', compression='zstd', index=False)
+        logger.debug(f"Cached {name} to {parquet_path}")
+    except (ValueError, TypeError) as e:
+        # Mixed-type object columns can't always be written; fall back to CSV next run
+        logger.warning(f"Could not cache {name} as Parquet: {e}")
+    return df
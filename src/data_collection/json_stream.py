@@ -0,0 +1,160 @@
+"""
+Streaming JSON Parsing Module
+
+This module turns JSON API responses into DataFrames without first building
+the full list of record dicts. Records are parsed incrementally with ijson
+and appended to per-column buffers, which are converted to Arrow-backed
+columns in one step.
+"""
+
+import itertools
+import logging
+from typing import Optional, List
+
+import ijson
+from ijson.common import ObjectBuilder
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ResponseReader:
+    """Minimal file-like view over a response's decoded body chunks."""
+
+    def __init__(self, response, chunk_size: int = CHUNK_SIZE):
+        self._chunks = response.iter_content(chunk_size=chunk_size)
+        self._buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def stream_to_df(
+    response,
+    columns: Optional[List[str]] = None,
+    prefix: str = 'item'
+) -> pd.DataFrame:
+    """
+    Parse a streamed JSON array of records into a DataFrame.
+
+    The response should be requested with stream=True so the body is parsed
+    chunk by chunk as it arrives. Chunks come from response.iter_content,
+    which handles gzip/deflate and responses served by requests-cache.
+
+    Args:
+        response: requests Response whose body is a JSON array of objects
+        columns: Columns to keep; by default (or if empty) every key seen
+            in the records
+        prefix: ijson path to the records (e.g., 'results.item' for
+            {"results": [...]})
+
+    Returns:
+        DataFrame with pyarrow-backed column dtypes
+    """
+    records = ijson.items(_ResponseReader(response), prefix, use_float=True)
+    return _records_to_df(records, columns)
+
+
+def stream_results_to_df(
+    response,
+    results_key: str = 'results',
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Parse a streamed JSON body whose shape varies between APIs.
+
+    Accepts a bare array of records, an object wrapping the records under
+    results_key (e.g., {"count": ..., "results": [...]}), or a single
+    record object. Wrapped records are still parsed one at a time.
+
+    Args:
+        response: requests Response requested with stream=True
+        results_key: Key holding the records in a wrapping object
+        columns: Columns to keep; by default every key seen in the records
+
+    Returns:
+        DataFrame with pyarrow-backed column dtypes
+    """
+    events = ijson.parse(_ResponseReader(response), use_float=True)
+    return _records_to_df(_iter_records(events, results_key), columns)
+
+
+def _iter_records(events, results_key: str):
+    """Yield records from parse events for any of the shapes above."""
+    first = next(events, None)
+    if first is None:
+        return
+    if first[1] == 'start_array':
+        yield from ijson.items(itertools.chain([first], events), 'item')
+        return
+    if first[1] != 'start_map':
+        return
+
+    # Build the top-level object except for the records, which are
+    # yielded as they complete
+    top = ObjectBuilder()
+    top.event('start_map', None)
+    item_prefix = f"{results_key}.item"
+    has_results = False
+    builder = None
+    for prefix, event, value in events:
+        if prefix == '' and event == 'map_key' and value == results_key:
+            has_results = True
+        elif prefix == results_key:
+            continue
+        elif builder is None and prefix == item_prefix:
+            if event in ('start_map', 'start_array'):
+                builder = ObjectBuilder()
+                builder.event(event, value)
+            else:
+                yield value
+        elif builder is not None:
+            builder.event(event, value)
+            if prefix == item_prefix and event in ('end_map', 'end_array'):
+                yield builder.value
+                builder = None
+        else:
+            top.event(event, value)
+
+    if not has_results:
+        # A single record object rather than a wrapper
+        yield top.value
+
+
+def _records_to_df(records, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Collect records into per-column buffers and build an Arrow-backed frame."""
+    buffers = {c: [] for c in columns} if columns else {}
+    n_rows = 0
+    for obj in records:
+        if not columns:
+            for key in obj:
+                if key not in buffers:
+                    # Backfill a column that first appears partway through
+                    buffers[key] = [None] * n_rows
+        for key, values in buffers.items():
+            values.append(obj.get(key))
+        n_rows += 1
+
+    if not buffers:
+        # Records without keys still count as rows
+        return pd.DataFrame(index=range(n_rows))
+    try:
+        table = pa.Table.from_pydict(buffers)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        # Columns mixing incompatible JSON types can't be typed by Arrow
+        logger.warning(f"Falling back to object columns: {e}")
+        return pd.DataFrame(buffers, index=range(n_rows))
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
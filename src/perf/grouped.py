@@ -0,0 +1,57 @@
+"""
+Grouped Aggregation Kernels
+
+Numba-compiled reductions for the state-level rollups in the analysis
+scripts. Group keys are mapped to integer codes once with pd.Categorical,
+and the kernels accumulate into a dense array indexed by those codes.
+"""
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+
+@njit(cache=True)
+def grouped_sum(labels: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Sum values per integer group label.
+
+    Rows with a negative label (missing key) or a NaN value are skipped,
+    matching pandas' groupby().sum().
+
+    Args:
+        labels: int64 group code for each row
+        values: float64 value for each row
+        n_groups: Number of distinct groups
+
+    Returns:
+        float64 array of length n_groups with the per-group sums
+    """
+    out = np.zeros(n_groups)
+    # Serial loop: scattered writes to out would race under prange
+    for i in range(labels.size):
+        label = labels[i]
+        value = values[i]
+        if label >= 0 and not np.isnan(value):
+            out[label] += value
+    return out
+
+
+def sum_by_group(keys: pd.Series, values: pd.Series) -> pd.Series:
+    """
+    Sum a numeric column grouped by a key column.
+
+    Args:
+        keys: Group keys (e.g., state abbreviations)
+        values: Numeric values to sum
+
+    Returns:
+        Series of sums indexed by the distinct keys
+    """
+    categorical = pd.Categorical(keys)
+    sums = grouped_sum(
+        categorical.codes.astype(np.int64),
+        values.to_numpy(dtype=np.float64, na_value=np.nan),
+        len(categorical.categories)
+    )
+    return pd.Series(sums, index=categorical.categories)
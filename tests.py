@@ -12,10 +12,64 @@ from pathlib import Path
 # Add src directory to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
+import contextlib
+import gzip
+import json
+import ijson
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
+import pyarrow as pa
+import requests
 from src.data_collection.fetch_erate_data import ERateDataCollector
+from src.data_collection import io_cache
+from src.data_collection.http_session import make_session
+from src.data_collection.json_stream import stream_to_df, stream_results_to_df
+from src.perf.grouped import sum_by_group
+
+
+def make_json_response(payload):
+    """Build a mock streamed response with the given JSON body."""
+    body = json.dumps(payload).encode()
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = payload
+    response.__enter__.return_value = response
+    # Serve the body in small chunks to exercise reads across chunk boundaries
+    response.iter_content.side_effect = lambda chunk_size=1: (
+        body[i:i + 7] for i in range(0, len(body), 7)
+    )
+    return response
+
+
+@contextlib.contextmanager
+def serve_bytes(body, headers=None):
+    """Serve a fixed JSON body from a local HTTP server; yields its URL."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/data.json"
+    finally:
+        server.shutdown()
+        server.server_close()
 
 
 class TestERateDataCollection(unittest.TestCase):
@@ -33,21 +87,62 @@ class TestERateDataCollection(unittest.TestCase):
             "https://opendata.usac.org/resource/avi8-svp9.json"
         )
     
-    def test_initialization_with_token(self):
-        """Test initialization with app token."""
-        collector = ERateDataCollector(app_token="test_token")
+    @patch('src.data_collection.fetch_erate_data.requests.Session.get')
+    def test_initialization_with_token(self, mock_get):
+        """Test that the app token is sent per request, not set on the session."""
+        mock_get.return_value = make_json_response([])
+        session = make_session()
+        collector = ERateDataCollector(app_token="test_token", session=session)
+        
+        collector.fetch_data(limit=1)
+        
         self.assertEqual(
-            collector.session.headers.get('X-App-Token'),
+            mock_get.call_args[1]['headers'].get('X-App-Token'),
             'test_token'
         )
+        self.assertNotIn('X-App-Token', session.headers)
+    
+    def test_cache_file_omits_app_token(self):
+        """Test that the app token is not written to the response cache."""
+        with serve_bytes(b'[]') as url:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                cache_path = os.path.join(tmpdir, 'erate_cache')
+                collector = ERateDataCollector(app_token='SECRETTOKEN', cache_path=cache_path)
+                collector.base_url = url
+                collector.fetch_data(limit=1)
+                collector.session.close()
+                
+                with open(cache_path + '.sqlite', 'rb') as f:
+                    contents = f.read()
+                self.assertIn(b'/data.json', contents)
+                self.assertNotIn(b'SECRETTOKEN', contents)
+    
+    def test_initialization_with_session(self):
+        """Test that a pre-built session is reused."""
+        session = make_session()
+        collector = ERateDataCollector(session=session)
+        self.assertIs(collector.session, session)
+    
+    def test_session_retry_policy(self):
+        """Test that the shared session retries transient HTTP errors."""
+        retries = self.collector.session.get_adapter('https://').max_retries
+        self.assertEqual(retries.total, 5)
+        self.assertIn(503, retries.status_forcelist)
+    
+    def test_initialization_with_cache_path(self):
+        """Test that a cache path enables the cached session."""
+        import tempfile
+        import requests_cache
+        with tempfile.TemporaryDirectory() as tmpdir:
+            collector = ERateDataCollector(cache_path=os.path.join(tmpdir, 'http_cache'))
+            self.assertIsInstance(collector.session, requests_cache.CachedSession)
+            collector.session.close()
     
     @patch('src.data_collection.fetch_erate_data.requests.Session.get')
     def test_fetch_data_success(self, mock_get):
         """Test successful data fetch."""
         # Mock API response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = [
+        mock_get.return_value = make_json_response([
             {
                 'entity_name': 'Test School District',
                 'funding_year': '2024',
@@ -55,8 +150,7 @@ class TestERateDataCollection(unittest.TestCase):
                 'applicant_type': 'School',
                 'total_commitment': '50000'
             }
-        ]
-        mock_get.return_value = mock_response
+        ])
         
         # Fetch data
         df = self.collector.fetch_data(funding_year=2024, limit=1)
@@ -69,10 +163,7 @@ class TestERateDataCollection(unittest.TestCase):
     @patch('src.data_collection.fetch_erate_data.requests.Session.get')
     def test_fetch_data_with_filters(self, mock_get):
         """Test data fetch with multiple filters."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = []
-        mock_get.return_value = mock_response
+        mock_get.return_value = make_json_response([])
         
         # Fetch with filters
         df = self.collector.fetch_data(
@@ -93,6 +184,115 @@ class TestERateDataCollection(unittest.TestCase):
         self.assertIn("state = 'CA'", params['$where'])
         self.assertIn("applicant_type = 'Library'", params['$where'])
     
+    @patch('src.data_collection.fetch_erate_data.requests.Session.get')
+    def test_fetch_data_truncated_body(self, mock_get):
+        """Test that a truncated body raises and still closes the response."""
+        response = make_json_response([])
+        response.iter_content.side_effect = lambda chunk_size=1: iter([b'[{"a": "1"'])
+        mock_get.return_value = response
+        
+        with self.assertLogs('src.data_collection.fetch_erate_data', level='ERROR'):
+            with self.assertRaises(ijson.JSONError):
+                self.collector.fetch_data(limit=1)
+        response.__exit__.assert_called_once()
+    
+    @patch('src.data_collection.fetch_erate_data.requests.Session.get')
+    def test_fetch_all_years_paginates(self, mock_get):
+        """Test that pages are fetched up to the counted total, in order."""
+        def fake_get(url, params=None, headers=None, timeout=None, stream=False):
+            if '$select' in params:
+                return make_json_response([{'n': '5'}])
+            start = params['$offset']
+            stop = min(start + params['$limit'], 5)
+            return make_json_response([{'row': i} for i in range(start, stop)])
+        mock_get.side_effect = fake_get
+        
+        df = self.collector.fetch_all_years(start_year=2024, end_year=2024, batch_size=2)
+        
+        self.assertEqual(df['row'].tolist(), [0, 1, 2, 3, 4])
+        # One count query plus three pages
+        self.assertEqual(mock_get.call_count, 4)
+    
+    @patch('src.data_collection.fetch_erate_data.requests.Session.get')
+    def test_fetch_all_years_cancels_on_error(self, mock_get):
+        """Test that a failed page cancels the pages still queued."""
+        def fake_get(url, params=None, headers=None, timeout=None, stream=False):
+            if '$select' in params:
+                return make_json_response([{'n': '20'}])
+            if params['$offset'] == 0:
+                raise requests.exceptions.ConnectionError('boom')
+            time.sleep(0.05)
+            return make_json_response([{'row': params['$offset']}])
+        mock_get.side_effect = fake_get
+        
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.collector.fetch_all_years(start_year=2024, end_year=2024, batch_size=2, max_workers=1)
+        
+        # Count query, the failed page and at most one page already running
+        self.assertLessEqual(mock_get.call_count, 3)
+    
+    @patch('src.data_collection.fetch_erate_data.requests.Session.get')
+    def test_fetch_all_years_mixed_page_types(self, mock_get):
+        """Test that pages Arrow can't combine still concatenate."""
+        pages = {
+            0: [{'row': 1}, {'row': 'x'}],   # mixed types -> object column
+            2: [{'row': 'y'}]                # string column on this page
+        }
+        def fake_get(url, params=None, headers=None, timeout=None, stream=False):
+            if '$select' in params:
+                return make_json_response([{'n': '3'}])
+            return make_json_response(pages[params['$offset']])
+        mock_get.side_effect = fake_get
+        
+        with self.assertLogs('src.data_collection.fetch_erate_data', level='WARNING'):
+            df = self.collector.fetch_all_years(start_year=2024, end_year=2024, batch_size=2)
+        
+        self.assertEqual(df['row'].tolist(), [1, 'x', 'y'])
+    
+    @patch('src.data_collection.fetch_erate_data.requests.Session.get')
+    def test_fetch_aggregates(self, mock_get):
+        """Test that aggregation is requested from the server."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = [
+            {'state': 'CA', 'n': '2', 'n_committed': '2', 'total': '30000'},
+            {'state': 'NY', 'n': '1', 'n_committed': '1', 'total': '15000'}
+        ]
+        mock_get.return_value = mock_response
+        
+        df = self.collector.fetch_aggregates(['state'], year=2024)
+        
+        params = mock_get.call_args[1]['params']
+        self.assertEqual(params['$group'], 'state')
+        self.assertIn('count(*) AS n', params['$select'])
+        self.assertEqual(params['$where'], 'funding_year = 2024')
+        self.assertEqual(df['n'].tolist(), [2, 1])
+        self.assertEqual(df['total'].sum(), 45000)
+    
+    @patch('src.data_collection.fetch_erate_data.requests.Session.get')
+    def test_get_summary_stats_server(self, mock_get):
+        """Test summary statistics computed from server aggregates."""
+        responses = {
+            'funding_year': [{'funding_year': '2024', 'n': '2', 'n_committed': '2', 'total': '30000'},
+                             {'funding_year': '2023', 'n': '1', 'n_committed': '1', 'total': '15000'}],
+            'state': [{'state': 'CA', 'n': '2', 'n_committed': '2', 'total': '30000'},
+                      {'state': 'NY', 'n': '1', 'n_committed': '1', 'total': '15000'}],
+            'applicant_type': [{'applicant_type': 'School', 'n': '2', 'n_committed': '2', 'total': '30000'},
+                               {'applicant_type': 'Library', 'n': '1', 'n_committed': '1', 'total': '15000'}]
+        }
+        def fake_get(url, params=None, headers=None, timeout=None):
+            response = MagicMock()
+            response.json.return_value = responses[params['$group']]
+            return response
+        mock_get.side_effect = fake_get
+        
+        stats = self.collector.get_summary_stats()
+        
+        self.assertEqual(stats['total_records'], 3)
+        self.assertEqual(stats['funding_years'], [2023, 2024])
+        self.assertEqual(stats['states'], 2)
+        self.assertEqual(stats['applicant_types'], {'School': 2, 'Library': 1})
+        self.assertEqual(stats['avg_commitment'], 15000)
+    
     def test_get_summary_stats_empty(self):
         """Test summary stats with empty DataFrame."""
         df = pd.DataFrame()
@@ -118,6 +318,17 @@ class TestERateDataCollection(unittest.TestCase):
         self.assertIn('School', stats['applicant_types'])
         self.assertIn('Library', stats['applicant_types'])
     
+    def test_get_summary_stats_arrow_strings(self):
+        """Test that unparseable commitments are skipped for Arrow-backed columns."""
+        df = pd.DataFrame({
+            'total_commitment': pd.array(['50000', 'abc'], dtype=pd.ArrowDtype(pa.string()))
+        })
+        
+        stats = self.collector.get_summary_stats(df)
+        
+        self.assertEqual(stats['total_funding'], 50000)
+        self.assertEqual(stats['avg_commitment'], 50000)
+    
     @patch('src.data_collection.fetch_erate_data.os.makedirs')
     @patch('pandas.DataFrame.to_csv')
     def test_save_data(self, mock_to_csv, mock_makedirs):
@@ -131,6 +342,131 @@ class TestERateDataCollection(unittest.TestCase):
         mock_to_csv.assert_called_once_with(output_path, index=False)
 
 
+class TestTableCache(unittest.TestCase):
+    """Test cases for cached table loading."""
+    
+    def setUp(self):
+        """Point the loader at a temporary data directory."""
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        raw_dir = os.path.join(self.tmpdir.name, 'raw')
+        os.makedirs(raw_dir)
+        pd.DataFrame({
+            'State Name': ['California', 'Texas'],
+            'Total Revenue In Thousands': [1000.0, 800.0],
+            'Public Library Count': [180, 560]
+        }).to_csv(os.path.join(raw_dir, 'imls_libraries.csv'), index=False)
+        
+        self.patches = [
+            patch.object(io_cache, 'RAW_DIR', raw_dir),
+            patch.object(io_cache, 'CACHE_DIR', os.path.join(self.tmpdir.name, 'cache')),
+        ]
+        for p in self.patches:
+            p.start()
+        io_cache.load_table.cache_clear()
+    
+    def tearDown(self):
+        """Remove the temporary data directory."""
+        for p in self.patches:
+            p.stop()
+        io_cache.load_table.cache_clear()
+        self.tmpdir.cleanup()
+    
+    def test_load_table_writes_parquet(self):
+        """Test that the first load creates the Parquet cache."""
+        df = io_cache.load_table('imls')
+        
+        self.assertEqual(len(df), 2)
+        self.assertTrue(os.path.exists(os.path.join(io_cache.CACHE_DIR, 'imls.parquet')))
+    
+    def test_load_table_memoized(self):
+        """Test that repeated loads return the cached DataFrame."""
+        self.assertIs(io_cache.load_table('imls'), io_cache.load_table('imls'))
+    
+    def test_load_table_unknown(self):
+        """Test that unknown table names are rejected."""
+        with self.assertRaises(KeyError):
+            io_cache.load_table('unknown')
+
+
+class TestJSONStream(unittest.TestCase):
+    """Test cases for streaming JSON parsing."""
+    
+    def test_stream_to_df_backfills_columns(self):
+        """Test that keys first seen in later records get missing values for earlier rows."""
+        response = make_json_response([{'a': '1'}, {'a': '2', 'b': 'x'}])
+        
+        df = stream_to_df(response)
+        
+        self.assertEqual(df.columns.tolist(), ['a', 'b'])
+        self.assertTrue(pd.isna(df.loc[0, 'b']))
+        self.assertEqual(df.loc[1, 'b'], 'x')
+    
+    def test_stream_to_df_gzip_through_cached_session(self):
+        """Test gzip bodies via a cached session, on both the miss and the hit."""
+        # Large enough that the compressed body spans several reads
+        records = [{'a': str(i), 'b': 'x' * 50} for i in range(5000)]
+        body = gzip.compress(json.dumps(records).encode())
+        
+        with serve_bytes(body, {'Content-Encoding': 'gzip'}) as url:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                session = make_session(os.path.join(tmpdir, 'http_cache'))
+                for expect_cached in (False, True):
+                    with session.get(url, timeout=5, stream=True) as response:
+                        self.assertEqual(response.from_cache, expect_cached)
+                        df = stream_to_df(response)
+                    self.assertEqual(len(df), 5000)
+                    self.assertEqual(df['a'].iloc[-1], '4999')
+                session.close()
+    
+    def test_stream_to_df_keeps_row_count(self):
+        """Test that keyless records and an empty column list keep every row."""
+        df = stream_to_df(make_json_response([{}, {}, {}]))
+        self.assertEqual(len(df), 3)
+        
+        df = stream_to_df(make_json_response([{'a': 1}, {'a': 2}]), columns=[])
+        self.assertEqual(df['a'].tolist(), [1, 2])
+    
+    def test_stream_results_to_df_shapes(self):
+        """Test wrapped, bare-list and single-object bodies."""
+        wrapped = {'count': 2, 'results': [{'n': 1, 'tags': [1, 2]}, {'n': 2, 'tags': []}]}
+        df = stream_results_to_df(make_json_response(wrapped))
+        self.assertEqual(df['n'].tolist(), [1, 2])
+        self.assertNotIn('count', df.columns)
+        
+        df = stream_results_to_df(make_json_response([{'n': 1}, {'n': 2}]))
+        self.assertEqual(df['n'].tolist(), [1, 2])
+        
+        df = stream_results_to_df(make_json_response({'n': 1, 'nested': {'x': 1}}))
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df['n'].tolist(), [1])
+        
+        df = stream_results_to_df(make_json_response({'count': 0, 'results': []}))
+        self.assertTrue(df.empty)
+    
+    def test_stream_to_df_nested_prefix(self):
+        """Test parsing records nested under a results key."""
+        response = make_json_response({'count': 2, 'results': [{'n': 1}, {'n': 2}]})
+        
+        df = stream_to_df(response, prefix='results.item')
+        
+        self.assertEqual(df['n'].tolist(), [1, 2])
+
+
+class TestGroupedSum(unittest.TestCase):
+    """Test cases for the grouped aggregation kernel."""
+    
+    def test_sum_by_group_matches_pandas(self):
+        """Test that grouped sums match pandas groupby, skipping missing values."""
+        keys = pd.Series(['CA', 'NY', 'CA', None, 'TX'])
+        values = pd.Series([1.0, 2.0, float('nan'), 5.0, 4.0])
+        
+        result = sum_by_group(keys, values)
+        expected = values.groupby(keys).sum()
+        
+        pd.testing.assert_series_equal(result, expected, check_names=False, check_index_type=False)
+
+
 class TestAPIConnectivity(unittest.TestCase):
     """Test actual API connectivity (integration test)."""
     
@@ -163,6 +499,9 @@ def run_tests():
     
     # Add test cases
     suite.addTests(loader.loadTestsFromTestCase(TestERateDataCollection))
+    suite.addTests(loader.loadTestsFromTestCase(TestTableCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestJSONStream))
+    suite.addTests(loader.loadTestsFromTestCase(TestGroupedSum))
     suite.addTests(loader.loadTestsFromTestCase(TestAPIConnectivity))
     
     # Run tests